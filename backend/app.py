@@ -1,25 +1,41 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
+from contextlib import asynccontextmanager, contextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import Response, StreamingResponse
 import json
 import asyncio
-from typing import List, Optional
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
 import uuid
 from datetime import datetime
 import os
 import sys
+import time
+import orjson
 
 # Add backend to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from models import ChatMessage, ChatRequest, ChatResponse, MessageRole
+from models import ChatMessage, ChatRequest, ChatBatchRequest, ChatResponse, MessageRole, SearchResult
 from database import Database
 from ollama_service import OllamaService
 from search_service import SearchService
+from static_service import StaticAssets
+from maintenance_service import MaintenanceService
+
+# Run database maintenance in the background for the lifetime of the app
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    maintenance_task = asyncio.create_task(maintenance.run())
+    yield
+    maintenance_task.cancel()
+    try:
+        # Let an in-progress archive write or vacuum step finish unwinding
+        await maintenance_task
+    except asyncio.CancelledError:
+        pass
 
 # Initialize FastAPI app
-app = FastAPI(title="Bao Chat API", version="1.0.0")
+app = FastAPI(title="Bao Chat API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -31,21 +47,52 @@ app.add_middleware(
 )
 
 # Initialize services
-db = Database()
+database_path = os.environ.get("DATABASE_PATH", "data/conversations.db")
+os.makedirs(os.path.dirname(database_path) or ".", exist_ok=True)
+db = Database(database_path)
 ollama = OllamaService()
 search = SearchService()
+static_assets = StaticAssets("frontend")
 
 # WebSocket connection manager
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, idle_after_seconds: float = 60):
         self.active_connections: List[WebSocket] = []
+        self.conversation_ids: Dict[WebSocket, str] = {}
+        # One entry per chat turn in flight over the WebSocket or HTTP (None if not tied to a conversation)
+        self.chat_turns: List[Optional[str]] = []
+        self.idle_after_seconds = idle_after_seconds
+        self.last_activity = 0.0
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, conversation_id: str):
         await websocket.accept()
         self.active_connections.append(websocket)
+        self.conversation_ids[websocket] = conversation_id
 
     def disconnect(self, websocket: WebSocket):
         self.active_connections.remove(websocket)
+        self.conversation_ids.pop(websocket, None)
+
+    @contextmanager
+    def chat_turn(self, conversation_id: Optional[str] = None):
+        """Track a chat turn in flight so maintenance treats the system as busy"""
+        self.chat_turns.append(conversation_id)
+        self.last_activity = time.monotonic()
+        try:
+            yield
+        finally:
+            self.chat_turns.remove(conversation_id)
+            self.last_activity = time.monotonic()
+
+    def is_idle(self) -> bool:
+        """No chat turn in flight and none for `idle_after_seconds`; open but quiet sockets don't count"""
+        return (
+            not self.chat_turns
+            and time.monotonic() - self.last_activity >= self.idle_after_seconds
+        )
+
+    def is_open(self, conversation_id: str) -> bool:
+        return conversation_id in self.conversation_ids.values() or conversation_id in self.chat_turns
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
@@ -54,15 +101,44 @@ class ConnectionManager:
         for connection in self.active_connections:
             await connection.send_text(message)
 
-manager = ConnectionManager()
+def optional_int_env(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+idle_after_seconds = optional_int_env("MAINTENANCE_IDLE_SECONDS")
+manager = ConnectionManager(idle_after_seconds=60 if idle_after_seconds is None else idle_after_seconds)
+
+# Retention limits are off unless set; archived conversations leave /conversations
+maintenance = MaintenanceService(
+    db,
+    is_idle=manager.is_idle,
+    is_in_use=manager.is_open,
+    archive_dir=os.environ.get("ARCHIVE_PATH", "data/archive"),
+    archive_after_days=optional_int_env("ARCHIVE_AFTER_DAYS"),
+    retention_days=optional_int_env("RETENTION_DAYS"),
+    max_conversations=optional_int_env("MAX_CONVERSATIONS"),
+    max_db_size_mb=optional_int_env("MAX_DATABASE_SIZE_MB")
+)
 
-# Serve frontend files
-@app.get("/")
-async def read_index():
-    return FileResponse("frontend/index.html")
+@app.get("/maintenance/status")
+async def maintenance_status():
+    return await maintenance.get_status()
 
-# Static files
-app.mount("/static", StaticFiles(directory="frontend"), name="static")
+# Serve frontend files
+@app.api_route("/", methods=["GET", "HEAD"])
+async def read_index(request: Request):
+    response = static_assets.response("index.html", request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return response
+
+# Static files (precompressed, content-hashed URLs are cached as immutable)
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def read_static(path: str, request: Request):
+    response = static_assets.response(path, request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return response
 
 # Health check endpoint
 @app.get("/health")
@@ -92,8 +168,19 @@ async def get_conversations():
 
 @app.get("/conversations/{conversation_id}/messages")
 async def get_messages(conversation_id: str, limit: int = 50):
-    messages = await db.get_conversation_history(conversation_id, limit)
-    return [msg.dict() for msg in messages]
+    messages_json = await db.get_conversation_history_json(conversation_id, limit)
+    return Response(content=messages_json, media_type="application/json")
+
+# Archived conversations
+@app.get("/conversations/archived")
+async def get_archived_conversations():
+    return maintenance.get_archived_conversation_ids()
+
+@app.post("/conversations/{conversation_id}/restore")
+async def restore_conversation(conversation_id: str):
+    if not await maintenance.restore_conversation(conversation_id):
+        raise HTTPException(status_code=404, detail="Archived conversation not found")
+    return {"status": "restored", "conversation_id": conversation_id}
 
 # Delete conversation
 @app.delete("/conversations/{conversation_id}")
@@ -101,18 +188,209 @@ async def delete_conversation(conversation_id: str):
     await db.delete_conversation(conversation_id)
     return {"status": "deleted", "conversation_id": conversation_id}
 
+# Limits for POST /chat/batch
+BATCH_MAX_WORKERS = 4
+BATCH_SEARCH_CONCURRENCY = 8
+
+async def chat_events(
+    conversation_id: Optional[str],
+    user_message: str,
+    enable_search: bool = True,
+    search_outcome: Optional[Tuple[List[SearchResult], str]] = None
+) -> AsyncGenerator[dict, None]:
+    """Run one chat turn, saving both messages and yielding the events sent to clients
+
+    Pass `search_outcome` to reuse results of a search that already ran, and
+    no `conversation_id` to answer without saving anything.
+    """
+    # Save user message
+    user_msg = ChatMessage(
+        role=MessageRole.USER,
+        content=user_message,
+        timestamp=datetime.now()
+    )
+    if conversation_id:
+        await db.save_message(conversation_id, user_msg)
+
+    # Check if search is needed
+    if search_outcome is None and enable_search and ollama.should_search(user_message):
+        yield {"type": "status", "message": "Searching the web..."}
+        search_outcome = await search.search_and_summarize(user_message)
+
+    search_results = None
+    search_summary = ""
+    if search_outcome is not None:
+        results, search_summary = search_outcome
+        search_results = [r.dict() for r in results]
+        yield {"type": "search_results", "results": search_results}
+
+    # Prepare context with search results
+    if conversation_id:
+        context = await db.get_conversation_history(conversation_id)
+    else:
+        context = [user_msg]
+    enhanced_prompt = user_message
+    if search_summary:
+        enhanced_prompt = f"{user_message}\n\n{search_summary}"
+
+    # Stream response from Ollama
+    yield {"type": "status", "message": "Bao is thinking..."}
+    yield {"type": "response_start"}
+
+    full_response = ""
+    async for chunk in ollama.generate_response(enhanced_prompt, context, stream=True):
+        full_response += chunk
+        yield {"type": "response_chunk", "content": chunk}
+
+    yield {"type": "response_end"}
+
+    # Save assistant message
+    if conversation_id:
+        assistant_msg = ChatMessage(
+            role=MessageRole.ASSISTANT,
+            content=full_response,
+            timestamp=datetime.now(),
+            requires_search=bool(search_results),
+            search_results=search_results
+        )
+        await db.save_message(conversation_id, assistant_msg)
+
+async def chat_events_with_response(
+    conversation_id: Optional[str],
+    user_message: str,
+    enable_search: bool = True,
+    search_outcome: Optional[Tuple[List[SearchResult], str]] = None
+) -> AsyncGenerator[dict, None]:
+    """Yield the chat_events of one turn, then a "done" event carrying its ChatResponse"""
+    full_response = ""
+    search_performed = False
+    async for event in chat_events(conversation_id, user_message, enable_search, search_outcome):
+        if event["type"] == "response_chunk":
+            full_response += event["content"]
+        elif event["type"] == "search_results":
+            search_performed = True
+        yield event
+
+    yield {
+        "type": "done",
+        "response": ChatResponse(
+            response=full_response,
+            conversation_id=conversation_id,
+            timestamp=datetime.now(),
+            search_performed=search_performed,
+            search_query=user_message if search_performed else None
+        )
+    }
+
+async def complete_chat(
+    conversation_id: Optional[str],
+    user_message: str,
+    enable_search: bool = True,
+    search_outcome: Optional[Tuple[List[SearchResult], str]] = None
+) -> ChatResponse:
+    """Run one chat turn to completion and return the full response"""
+    response = None
+    async for event in chat_events_with_response(conversation_id, user_message, enable_search, search_outcome):
+        if event["type"] == "done":
+            response = event["response"]
+    return response
+
+# Chat over HTTP, streamed as Server-Sent Events
+@app.post("/chat")
+async def chat(request: ChatRequest):
+    conversation_id = request.conversation_id or await db.create_conversation()
+
+    async def event_stream():
+        with manager.chat_turn(conversation_id):
+            try:
+                async for event in chat_events_with_response(conversation_id, request.message, request.enable_search):
+                    if event["type"] == "done":
+                        data = orjson.dumps(event["response"].dict())
+                    else:
+                        data = orjson.dumps(event)
+                    yield b"event: " + event["type"].encode() + b"\ndata: " + data + b"\n\n"
+            except Exception as e:
+                # Report the failure like /chat/batch does instead of cutting the stream
+                data = orjson.dumps({"type": "error", "conversation_id": conversation_id, "detail": str(e)})
+                yield b"event: error\ndata: " + data + b"\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Answer many prompts, streamed back as NDJSON in completion order
+@app.post("/chat/batch")
+async def chat_batch(request: ChatBatchRequest):
+    start = time.perf_counter()
+
+    # Identical prompts are answered once and reported for every index
+    indexes_by_prompt = {}
+    for index, prompt in enumerate(request.prompts):
+        indexes_by_prompt.setdefault(prompt, []).append(index)
+
+    search_slots = asyncio.Semaphore(BATCH_SEARCH_CONCURRENCY)
+    generation_slots = asyncio.Semaphore(max(1, min(request.max_workers, BATCH_MAX_WORKERS)))
+
+    async def answer(prompt: str) -> dict:
+        result = {"indexes": indexes_by_prompt[prompt], "prompt": prompt}
+        try:
+            # Searches for the whole batch start at once; only generation waits for a worker
+            search_outcome = None
+            if request.enable_search and ollama.should_search(prompt):
+                async with search_slots:
+                    search_outcome = await search.search_and_summarize(prompt)
+
+            async with generation_slots:
+                # Batch answers stay out of the sidebar unless asked to persist
+                conversation_id = await db.create_conversation() if request.persist else None
+                with manager.chat_turn(conversation_id):
+                    response = await complete_chat(
+                        conversation_id, prompt, enable_search=False, search_outcome=search_outcome
+                    )
+            return {"type": "result", **result, **response.dict()}
+        except Exception as e:
+            return {"type": "error", **result, "detail": str(e)}
+
+    async def result_stream():
+        failed = 0
+        with manager.chat_turn():
+            tasks = [asyncio.create_task(answer(prompt)) for prompt in indexes_by_prompt]
+            try:
+                for next_result in asyncio.as_completed(tasks):
+                    result = await next_result
+                    if result["type"] == "error":
+                        failed += 1
+                    yield orjson.dumps(result) + b"\n"
+            finally:
+                # Stop outstanding work if the client disconnects
+                for task in tasks:
+                    task.cancel()
+
+        elapsed = time.perf_counter() - start
+        yield orjson.dumps({
+            "type": "summary",
+            "prompts": len(request.prompts),
+            "unique_prompts": len(indexes_by_prompt),
+            "failed_prompts": failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "prompts_per_second": round(len(request.prompts) / elapsed, 3) if elapsed else None
+        }) + b"\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
 # WebSocket endpoint for real-time chat
 @app.websocket("/ws/{conversation_id}")
 async def websocket_endpoint(websocket: WebSocket, conversation_id: str):
-    await manager.connect(websocket)
+    await manager.connect(websocket, conversation_id)
 
     try:
         # Send conversation history
-        history = await db.get_conversation_history(conversation_id)
-        await websocket.send_json({
-            "type": "history",
-            "messages": [msg.dict() for msg in history]
-        })
+        history_json = await db.get_conversation_history_json(conversation_id)
+        await websocket.send_text(
+            (b'{"type":"history","messages":' + history_json + b'}').decode()
+        )
 
         while True:
             # Receive message from client
@@ -122,74 +400,13 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str):
             if message_data.get("type") == "chat":
                 user_message = message_data.get("message", "")
 
-                # Save user message
-                user_msg = ChatMessage(
-                    role=MessageRole.USER,
-                    content=user_message,
-                    timestamp=datetime.now()
-                )
-                await db.save_message(conversation_id, user_msg)
-
-                # Check if search is needed
-                search_results = None
-                search_summary = ""
-
-                if ollama.should_search(user_message) and message_data.get("enable_search", True):
-                    # Send search status
-                    await websocket.send_json({
-                        "type": "status",
-                        "message": "Searching the web..."
-                    })
-
-                    # Perform search
-                    results, summary = await search.search_and_summarize(user_message)
-                    search_results = [r.dict() for r in results]
-                    search_summary = summary
-
-                    # Send search results
-                    await websocket.send_json({
-                        "type": "search_results",
-                        "results": search_results
-                    })
-
-                # Prepare context with search results
-                context = await db.get_conversation_history(conversation_id)
-                enhanced_prompt = user_message
-                if search_summary:
-                    enhanced_prompt = f"{user_message}\n\n{search_summary}"
-
-                # Generate response
-                await websocket.send_json({
-                    "type": "status",
-                    "message": "Bao is thinking..."
-                })
-
-                # Stream response from Ollama
-                full_response = ""
-                await websocket.send_json({
-                    "type": "response_start"
-                })
-
-                async for chunk in ollama.generate_response(enhanced_prompt, context, stream=True):
-                    full_response += chunk
-                    await websocket.send_json({
-                        "type": "response_chunk",
-                        "content": chunk
-                    })
-
-                await websocket.send_json({
-                    "type": "response_end"
-                })
-
-                # Save assistant message
-                assistant_msg = ChatMessage(
-                    role=MessageRole.ASSISTANT,
-                    content=full_response,
-                    timestamp=datetime.now(),
-                    requires_search=bool(search_results),
-                    search_results=search_results
-                )
-                await db.save_message(conversation_id, assistant_msg)
+                with manager.chat_turn(conversation_id):
+                    async for event in chat_events(
+                        conversation_id,
+                        user_message,
+                        enable_search=message_data.get("enable_search", True)
+                    ):
+                        await websocket.send_json(event)
 
             elif message_data.get("type") == "ping":
                 await websocket.send_json({"type": "pong"})
@@ -1,9 +1,11 @@
 import sqlite3
+import os
 import json
 from datetime import datetime
 from typing import List, Optional
 import asyncio
 import aiosqlite
+import orjson
 from models import ChatMessage, ConversationHistory, MessageRole
 import uuid
 
@@ -17,6 +19,11 @@ class Database:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
+        # Let freed pages be reclaimed in small steps (see incremental_vacuum).
+        # Only takes effect before the first table is created; existing
+        # databases are converted by the maintenance task instead.
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS conversations (
                 id TEXT PRIMARY KEY,
@@ -114,6 +121,38 @@ class Database:
 
             return messages
 
+    async def get_conversation_history_json(self, conversation_id: str, limit: int = 50) -> bytes:
+        """Retrieve conversation history already encoded as a JSON array.
+
+        Skips building ChatMessage models: rows go straight to plain dicts and
+        are serialized once with orjson, matching the output of
+        ``[msg.dict() for msg in get_conversation_history(...)]`` once encoded.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                """SELECT role, content, timestamp, requires_search, search_results
+                   FROM messages
+                   WHERE conversation_id = ?
+                   ORDER BY timestamp DESC
+                   LIMIT ?""",
+                (conversation_id, limit)
+            )
+            rows = await cursor.fetchall()
+
+        loads = orjson.loads
+        messages = [
+            {
+                "role": role,
+                "content": content,
+                # sqlite stores datetimes as "YYYY-MM-DD HH:MM:SS"; emit ISO 8601 like pydantic does
+                "timestamp": timestamp.replace(" ", "T", 1) if timestamp else None,
+                "requires_search": bool(requires_search),
+                "search_results": loads(search_results) if search_results else None,
+            }
+            for role, content, timestamp, requires_search, search_results in reversed(rows)
+        ]
+        return orjson.dumps(messages)
+
     async def get_all_conversations(self) -> List[dict]:
         """Get all conversation summaries"""
         async with aiosqlite.connect(self.db_path) as db:
@@ -134,4 +173,153 @@ class Database:
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
             await db.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
-            await db.commit()
\ No newline at end of file
+            await db.commit()
+
+    async def get_conversation_ids_updated_before(self, cutoff: datetime) -> List[str]:
+        """Get IDs of conversations not updated since cutoff, oldest first"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT id FROM conversations WHERE updated_at < ? ORDER BY updated_at ASC",
+                (cutoff,)
+            )
+            rows = await cursor.fetchall()
+            return [row[0] for row in rows]
+
+    async def get_oldest_conversation_ids(self, keep: int = 0, limit: int = -1) -> List[str]:
+        """Get IDs of conversations beyond the `keep` most recently updated, oldest first"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                """SELECT id FROM (
+                       SELECT id, updated_at FROM conversations
+                       ORDER BY updated_at DESC
+                       LIMIT -1 OFFSET ?
+                   )
+                   ORDER BY updated_at ASC
+                   LIMIT ?""",
+                (keep, limit)
+            )
+            rows = await cursor.fetchall()
+            return [row[0] for row in rows]
+
+    async def export_conversation(self, conversation_id: str) -> Optional[dict]:
+        """Get a conversation and its raw message rows for archiving"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                "SELECT * FROM conversations WHERE id = ?", (conversation_id,)
+            )
+            conversation = await cursor.fetchone()
+            if not conversation:
+                return None
+
+            cursor = await db.execute(
+                """SELECT id, role, content, timestamp, requires_search, search_results
+                   FROM messages
+                   WHERE conversation_id = ?
+                   ORDER BY id""",
+                (conversation_id,)
+            )
+            rows = await cursor.fetchall()
+
+            return {
+                "conversation": dict(conversation),
+                "messages": [{key: row[key] for key in row.keys() if key != "id"} for row in rows],
+                # Lets delete_exported_conversation keep messages saved after this export
+                "last_message_id": rows[-1]["id"] if rows else 0
+            }
+
+    async def delete_exported_conversation(self, conversation_id: str, last_message_id: int) -> bool:
+        """Delete the messages export_conversation returned, and the conversation if nothing newer exists
+
+        Messages saved after the export are kept along with their conversation.
+        Returns True if the conversation itself was deleted.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "DELETE FROM messages WHERE conversation_id = ? AND id <= ?",
+                (conversation_id, last_message_id)
+            )
+            cursor = await db.execute(
+                """DELETE FROM conversations
+                   WHERE id = ?
+                   AND NOT EXISTS (SELECT 1 FROM messages WHERE conversation_id = ?)""",
+                (conversation_id, conversation_id)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+
+    async def import_conversation(self, data: dict):
+        """Insert a conversation previously returned by export_conversation"""
+        conversation = data["conversation"]
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO conversations (id, created_at, updated_at) VALUES (?, ?, ?)",
+                (conversation["id"], conversation["created_at"], datetime.now())
+            )
+            await db.executemany(
+                """INSERT INTO messages
+                   (conversation_id, role, content, timestamp, requires_search, search_results)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [
+                    (
+                        conversation["id"],
+                        msg["role"],
+                        msg["content"],
+                        msg["timestamp"],
+                        msg["requires_search"],
+                        msg["search_results"]
+                    )
+                    for msg in data["messages"]
+                ]
+            )
+            await db.commit()
+
+    async def get_storage_stats(self) -> dict:
+        """Get database file size, page usage and row counts"""
+        async with aiosqlite.connect(self.db_path) as db:
+            stats = {}
+            for pragma in ("page_size", "page_count", "freelist_count"):
+                cursor = await db.execute(f"PRAGMA {pragma}")
+                stats[pragma] = (await cursor.fetchone())[0]
+
+            cursor = await db.execute("SELECT COUNT(*) FROM conversations")
+            stats["conversation_count"] = (await cursor.fetchone())[0]
+            cursor = await db.execute("SELECT COUNT(*) FROM messages")
+            stats["message_count"] = (await cursor.fetchone())[0]
+
+        stats["file_size"] = os.path.getsize(self.db_path)
+        stats["used_size"] = (stats["page_count"] - stats["freelist_count"]) * stats["page_size"]
+        stats["free_size"] = stats["freelist_count"] * stats["page_size"]
+        stats["fragmentation"] = (
+            stats["freelist_count"] / stats["page_count"] if stats["page_count"] else 0.0
+        )
+        return stats
+
+    async def has_incremental_vacuum(self) -> bool:
+        """Check whether the database file uses auto_vacuum=INCREMENTAL"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("PRAGMA auto_vacuum")
+            return (await cursor.fetchone())[0] == 2
+
+    async def enable_incremental_vacuum(self):
+        """Switch an existing database to auto_vacuum=INCREMENTAL
+
+        Needs a full VACUUM, which rewrites the file and temporarily needs
+        about as much free disk space as the database itself.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+
+    async def incremental_vacuum(self, pages: int) -> int:
+        """Release up to `pages` free pages to the filesystem, return pages still free"""
+        async with aiosqlite.connect(self.db_path) as db:
+            # executescript steps the pragma to completion; execute() frees a single page
+            await db.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            cursor = await db.execute("PRAGMA freelist_count")
+            return (await cursor.fetchone())[0]
+
+    async def analyze(self):
+        """Refresh query planner statistics"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("ANALYZE")
+            await db.commit()
@@ -0,0 +1,248 @@
+import asyncio
+import gzip
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+import orjson
+from database import Database
+
+
+class MaintenanceService:
+    def __init__(
+        self,
+        db: Database,
+        is_idle: Callable[[], bool] = lambda: True,
+        is_in_use: Callable[[str], bool] = lambda conversation_id: False,
+        archive_dir: str = "data/archive",
+        archive_after_days: Optional[int] = None,
+        retention_days: Optional[int] = None,
+        max_conversations: Optional[int] = None,
+        max_db_size_mb: Optional[int] = None,
+        interval_seconds: int = 600,
+        analyze_interval_hours: int = 24,
+        vacuum_step_pages: int = 64,
+        vacuum_step_delay: float = 0.5
+    ):
+        """Background retention, archiving, vacuum and ANALYZE for the conversations database.
+
+        Archiving and retention are disabled unless their limits are set.
+        Conversations idle for `archive_after_days` are moved to gzip files in
+        `archive_dir` and can be restored; conversations past `retention_days`,
+        beyond the newest `max_conversations` or pushing the database over
+        `max_db_size_mb` are deleted oldest first. Conversations for which
+        `is_in_use(conversation_id)` is true are never archived or deleted.
+        Vacuum steps and ANALYZE only run while `is_idle()`.
+        """
+        self.db = db
+        self.is_idle = is_idle
+        self.is_in_use = is_in_use
+        self.archive_dir = archive_dir
+        self.archive_after_days = archive_after_days
+        self.retention_days = retention_days
+        self.max_conversations = max_conversations
+        self.max_db_size_mb = max_db_size_mb
+        self.interval_seconds = interval_seconds
+        self.analyze_interval_hours = analyze_interval_hours
+        self.vacuum_step_pages = vacuum_step_pages
+        self.vacuum_step_delay = vacuum_step_delay
+
+        self.last_run: Optional[datetime] = None
+        self.last_vacuum: Optional[datetime] = None
+        self.last_analyze: Optional[datetime] = None
+        self.archived_total = 0
+        self.deleted_total = 0
+        self.incremental_vacuum_enabled = False
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+    async def run(self):
+        """Run maintenance forever, every `interval_seconds`"""
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Maintenance error: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_once(self):
+        """Archive cold conversations and apply retention, then vacuum and analyze if idle"""
+        # Archive first so cold conversations are kept rather than deleted by count/size limits
+        await self.archive_cold_conversations()
+        await self.apply_retention()
+
+        if self.is_idle() and not self.incremental_vacuum_enabled:
+            await self.enable_incremental_vacuum()
+
+        if self.is_idle():
+            await self.vacuum_while_idle()
+
+        analyze_due = (
+            self.last_analyze is None
+            or datetime.now() - self.last_analyze >= timedelta(hours=self.analyze_interval_hours)
+        )
+        if analyze_due and self.is_idle():
+            await self.db.analyze()
+            self.last_analyze = datetime.now()
+
+        self.last_run = datetime.now()
+
+    async def apply_retention(self):
+        """Delete conversations that exceed the age, count or size limits"""
+        if self.retention_days is not None:
+            cutoff = datetime.now() - timedelta(days=self.retention_days)
+            await self._delete(await self.db.get_conversation_ids_updated_before(cutoff))
+            await asyncio.to_thread(self._delete_expired_archives, cutoff)
+
+        if self.max_conversations is not None:
+            await self._delete(await self.db.get_oldest_conversation_ids(keep=self.max_conversations))
+
+        if self.max_db_size_mb is not None:
+            max_bytes = self.max_db_size_mb * 1024 * 1024
+            skipped = 0
+            while (await self.db.get_storage_stats())["used_size"] > max_bytes:
+                oldest = await self.db.get_oldest_conversation_ids(limit=skipped + 10)
+                deleted = await self._delete(oldest)
+                if not deleted:
+                    break
+                skipped += len(oldest) - deleted
+
+    async def archive_cold_conversations(self):
+        """Move conversations idle for `archive_after_days` into compressed archive files"""
+        if self.archive_after_days is None:
+            return
+
+        cutoff = datetime.now() - timedelta(days=self.archive_after_days)
+        for conversation_id in await self.db.get_conversation_ids_updated_before(cutoff):
+            if await self.archive_conversation(conversation_id):
+                self.archived_total += 1
+
+    async def archive_conversation(self, conversation_id: str) -> bool:
+        """Write a conversation to its archive file and remove it from the database"""
+        if self.is_in_use(conversation_id):
+            return False
+
+        data = await self.db.export_conversation(conversation_id)
+        if data is None:
+            return False
+
+        await asyncio.to_thread(self._write_archive, conversation_id, data)
+        # Only remove what was written; messages saved meanwhile stay for the next archive run
+        await self.db.delete_exported_conversation(conversation_id, data["last_message_id"])
+        return True
+
+    async def restore_conversation(self, conversation_id: str) -> bool:
+        """Load an archived conversation back into the database"""
+        path = self._archive_path(conversation_id)
+        if not os.path.exists(path):
+            return False
+
+        data = await asyncio.to_thread(self._read_archive, path)
+        await self.db.import_conversation(data)
+        os.remove(path)
+        return True
+
+    def get_archived_conversation_ids(self) -> List[str]:
+        """List IDs of conversations stored in the archive"""
+        return [
+            name[:-len(".json.gz")]
+            for name in os.listdir(self.archive_dir)
+            if name.endswith(".json.gz")
+        ]
+
+    async def enable_incremental_vacuum(self):
+        """Convert a database created before incremental vacuum was enabled, once"""
+        if await self.db.has_incremental_vacuum():
+            self.incremental_vacuum_enabled = True
+            return
+
+        try:
+            await self.db.enable_incremental_vacuum()
+        except sqlite3.Error as e:
+            # Locked database or not enough free space; retried on the next idle run
+            print(f"Could not enable incremental vacuum: {e}")
+            return
+        self.incremental_vacuum_enabled = await self.db.has_incremental_vacuum()
+
+    async def vacuum_while_idle(self):
+        """Release free pages in small steps, stopping as soon as the system is busy"""
+        while self.is_idle():
+            remaining = await self.db.incremental_vacuum(self.vacuum_step_pages)
+            self.last_vacuum = datetime.now()
+            if remaining == 0:
+                break
+            await asyncio.sleep(self.vacuum_step_delay)
+
+    async def get_status(self) -> dict:
+        """Report database size, fragmentation and maintenance history"""
+        stats = await self.db.get_storage_stats()
+        archived = self.get_archived_conversation_ids()
+        return {
+            "database": stats,
+            "archive": {
+                "conversation_count": len(archived),
+                "size": sum(
+                    os.path.getsize(self._archive_path(conversation_id))
+                    for conversation_id in archived
+                ),
+            },
+            "idle": self.is_idle(),
+            "incremental_vacuum": self.incremental_vacuum_enabled,
+            "last_run": self.last_run,
+            "last_vacuum": self.last_vacuum,
+            "last_analyze": self.last_analyze,
+            "archived_total": self.archived_total,
+            "deleted_total": self.deleted_total,
+            "config": {
+                "archive_after_days": self.archive_after_days,
+                "retention_days": self.retention_days,
+                "max_conversations": self.max_conversations,
+                "max_db_size_mb": self.max_db_size_mb,
+            },
+        }
+
+    async def _delete(self, conversation_ids: List[str]) -> int:
+        deleted = 0
+        for conversation_id in conversation_ids:
+            if self.is_in_use(conversation_id):
+                continue
+            await self.db.delete_conversation(conversation_id)
+            deleted += 1
+        self.deleted_total += deleted
+        return deleted
+
+    def _delete_expired_archives(self, cutoff: datetime):
+        # Compare the conversation's last update, not when it was archived
+        for conversation_id in self.get_archived_conversation_ids():
+            path = self._archive_path(conversation_id)
+            updated_at = self._read_archive(path)["conversation"]["updated_at"]
+            if datetime.fromisoformat(updated_at) < cutoff:
+                os.remove(path)
+
+    def _archive_path(self, conversation_id: str) -> str:
+        return os.path.join(self.archive_dir, f"{os.path.basename(conversation_id)}.json.gz")
+
+    def _write_archive(self, conversation_id: str, data: dict):
+        path = self._archive_path(conversation_id)
+        data = {"conversation": data["conversation"], "messages": data["messages"]}
+        if os.path.exists(path):
+            # The conversation was archived before and picked up new messages since
+            archived = self._read_archive(path)
+            data = {
+                "conversation": {
+                    **data["conversation"],
+                    "created_at": archived["conversation"]["created_at"]
+                },
+                "messages": archived["messages"] + data["messages"]
+            }
+
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(data))
+        os.replace(tmp_path, path)
+
+    def _read_archive(self, path: str) -> dict:
+        with gzip.open(path, "rb") as f:
+            return orjson.loads(f.read())
@@ -20,9 +20,15 @@ class ChatRequest(BaseModel):
     conversation_id: Optional[str] = None
     enable_search: bool = True
 
+class ChatBatchRequest(BaseModel):
+    prompts: List[str]
+    enable_search: bool = True
+    max_workers: int = 2
+    persist: bool = False
+
 class ChatResponse(BaseModel):
     response: str
-    conversation_id: str
+    conversation_id: Optional[str] = None
     timestamp: datetime
     search_performed: bool = False
     search_query: Optional[str] = None
@@ -0,0 +1,172 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # Fall back to gzip only if the brotli wheel is unavailable
+    brotli = None
+
+# Assets up to this size are kept in memory together with their compressed variants
+MAX_MEMORY_ASSET_SIZE = 256 * 1024
+
+# Hashed asset URLs never change content, so browsers may cache them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Unhashed URLs (index.html, direct links) must be revalidated with the ETag
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# Files whose "/static/..." references are rewritten to hashed URLs
+REWRITABLE_EXTENSIONS = (".html", ".js", ".css")
+STATIC_URL_PATTERN = re.compile(r"/static/([\w./-]+)")
+
+
+class StaticAsset:
+    def __init__(self, path: str, url_path: str, content_hash: str, media_type: str):
+        self.path = path
+        self.url_path = url_path
+        self.content_hash = content_hash
+        self.media_type = media_type
+        # encoding ("identity", "gzip", "br") -> body, only for in-memory assets
+        self.variants: Dict[str, bytes] = {}
+
+    def etag(self, encoding: str) -> str:
+        if encoding == "identity":
+            return f'"{self.content_hash}"'
+        return f'"{self.content_hash}-{encoding}"'
+
+
+class StaticAssets:
+    def __init__(self, directory: str = "frontend"):
+        self.directory = directory
+        # url path -> (asset, served under its content-hashed name)
+        self.routes: Dict[str, Tuple[StaticAsset, bool]] = {}
+        self._build()
+
+    def _build(self):
+        """Hash, rewrite and precompress every file in the frontend directory"""
+        hashed_urls: Dict[str, str] = {}
+        for rel_path in self._ordered_files():
+            full_path = os.path.join(self.directory, rel_path)
+            with open(full_path, "rb") as f:
+                content = f.read()
+
+            # Point references at already-hashed assets so they are cached too
+            rewritten = rel_path.endswith(REWRITABLE_EXTENSIONS)
+            if rewritten:
+                content = self._rewrite_urls(content, hashed_urls)
+
+            content_hash = hashlib.sha256(content).hexdigest()[:12]
+            root, ext = os.path.splitext(rel_path)
+            hashed_path = f"{root}.{content_hash}{ext}"
+            media_type = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+
+            asset = StaticAsset(full_path, rel_path, content_hash, media_type)
+            if len(content) <= MAX_MEMORY_ASSET_SIZE:
+                asset.variants = self._compress(content, media_type)
+            elif rewritten:
+                # The file on disk differs from the hashed content, so serve the rewritten bytes
+                asset.variants = {"identity": content}
+
+            hashed_urls[rel_path] = hashed_path
+            self.routes[rel_path] = (asset, False)
+            self.routes[hashed_path] = (asset, True)
+
+    def _ordered_files(self) -> List[str]:
+        """List files so that referenced assets are hashed before the files referencing them"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                files.append(os.path.relpath(os.path.join(root, name), self.directory).replace(os.sep, "/"))
+
+        def priority(rel_path: str) -> int:
+            if rel_path.endswith(".html"):
+                return 2
+            if rel_path.endswith(REWRITABLE_EXTENSIONS):
+                return 1
+            return 0
+
+        return sorted(files, key=lambda rel_path: (priority(rel_path), rel_path))
+
+    def _rewrite_urls(self, content: bytes, hashed_urls: Dict[str, str]) -> bytes:
+        text = content.decode("utf-8")
+
+        def replace(match: re.Match) -> str:
+            hashed = hashed_urls.get(match.group(1))
+            return f"/static/{hashed}" if hashed else match.group(0)
+
+        return STATIC_URL_PATTERN.sub(replace, text).encode("utf-8")
+
+    def _compress(self, content: bytes, media_type: str) -> Dict[str, bytes]:
+        variants = {"identity": content}
+        if not media_type.startswith(COMPRESSIBLE_TYPES):
+            return variants
+
+        gzipped = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(gzipped) < len(content):
+            variants["gzip"] = gzipped
+        if brotli is not None:
+            compressed = brotli.compress(content, quality=11)
+            if len(compressed) < len(content):
+                variants["br"] = compressed
+        return variants
+
+    def response(self, url_path: str, request: Request) -> Optional[Response]:
+        """Build the response for a static path, or None if it does not exist"""
+        route = self.routes.get(url_path)
+        if route is None:
+            return None
+        asset, immutable = route
+
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+
+        if not asset.variants:
+            # Large unmodified asset: stream it from disk uncompressed
+            etag = asset.etag("identity")
+            headers["ETag"] = etag
+            if self._etag_matches(request, etag):
+                return Response(status_code=304, headers=headers)
+            return FileResponse(asset.path, media_type=asset.media_type, headers=headers)
+
+        encoding = self._choose_encoding(request.headers.get("accept-encoding", ""), asset.variants)
+        etag = asset.etag(encoding)
+        headers["ETag"] = etag
+        if self._etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=asset.variants[encoding], media_type=asset.media_type, headers=headers)
+
+    def _choose_encoding(self, accept_encoding: str, variants: Dict[str, bytes]) -> str:
+        accepted = {}
+        for part in accept_encoding.split(","):
+            token, _, params = part.strip().partition(";")
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            if token:
+                accepted[token.strip().lower()] = quality
+
+        for encoding in ("br", "gzip"):
+            if encoding in variants and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding
+        return "identity"
+
+    def _etag_matches(self, request: Request, etag: str) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
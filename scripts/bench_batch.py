@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Batch chat throughput benchmark
+
+Starts a stub Ollama server that streams a fixed reply with a per-token
+delay, points the app at it and posts the same batch to /chat/batch with
+different worker counts. Web search is disabled so only generation is
+measured. Runs against a temporary database; nothing under data/ is touched.
+
+Usage: python scripts/bench_batch.py [--prompts 24] [--duplicates 8] [--tokens 20]
+                                     [--token-delay 0.01] [--stub-parallel 4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+
+from aiohttp import web
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def start_stub_ollama(tokens: int, token_delay: float, parallel: int) -> str:
+    """Serve /api/chat like Ollama's streaming API on a background thread, return its base URL"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    async def chat(request: web.Request) -> web.StreamResponse:
+        # Like Ollama, only `parallel` requests are generated at a time
+        async with request.app["slots"]:
+            response = web.StreamResponse()
+            response.content_type = "application/x-ndjson"
+            await response.prepare(request)
+            for i in range(tokens):
+                await asyncio.sleep(token_delay)
+                chunk = {"message": {"role": "assistant", "content": f"bao{i} "}, "done": False}
+                await response.write(json.dumps(chunk).encode() + b"\n")
+            await response.write(json.dumps({"done": True}).encode() + b"\n")
+            return response
+
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        app = web.Application()
+        app["slots"] = asyncio.Semaphore(parallel)
+        app.router.add_post("/api/chat", chat)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=24, help="prompts in the batch")
+    parser.add_argument("--duplicates", type=int, default=8, help="how many of them repeat an earlier prompt")
+    parser.add_argument("--tokens", type=int, default=20, help="tokens per stub reply")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds per stub token")
+    parser.add_argument("--stub-parallel", type=int, default=4, help="requests the stub generates at once")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_PATH"] = os.path.join(tmp.name, "conversations.db")
+    os.environ["ARCHIVE_PATH"] = os.path.join(tmp.name, "archive")
+    os.chdir(REPO_DIR)  # the app serves frontend/ relative to the working directory
+    sys.path.insert(0, os.path.join(REPO_DIR, "backend"))
+
+    import app as bao
+    from fastapi.testclient import TestClient
+
+    stub_url = start_stub_ollama(args.tokens, args.token_delay, args.stub_parallel)
+    bao.ollama.api_chat = f"{stub_url}/api/chat"
+
+    unique = args.prompts - args.duplicates
+    prompts = [f"FAQ question {i % unique}" for i in range(args.prompts)]
+
+    print(f"{args.prompts} prompts ({unique} unique), stub: {args.tokens} tokens x {args.token_delay}s, "
+          f"{args.stub_parallel} parallel")
+    print(f"{'workers':>7} {'seconds':>9} {'prompts/s':>10} {'failed':>7}")
+
+    with TestClient(bao.app) as client:
+        for workers in range(1, bao.BATCH_MAX_WORKERS + 1):
+            summary = None
+            with client.stream("POST", "/chat/batch", json={
+                "prompts": prompts,
+                "enable_search": False,
+                "max_workers": workers
+            }) as response:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if event["type"] == "summary":
+                        summary = event
+            print(f"{workers:>7} {summary['elapsed_seconds']:>9.3f} {summary['prompts_per_second']:>10.2f} "
+                  f"{summary['failed_prompts']:>7}")
+
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+History serialization microbenchmark
+
+Compares the model path (get_conversation_history + .dict() + json)
+against the orjson fast path (get_conversation_history_json), reporting
+time and peak allocated memory per message.
+
+Usage: python scripts/bench_history.py [--messages 50] [--runs 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from database import Database
+from models import ChatMessage, MessageRole
+
+
+def encode_models(messages):
+    # What send_json/FastAPI did before: .dict() per message, then encode
+    return json.dumps({"type": "history", "messages": [msg.dict() for msg in messages]}, default=str)
+
+
+async def model_path(db, conversation_id, limit):
+    return encode_models(await db.get_conversation_history(conversation_id, limit))
+
+
+async def fast_path(db, conversation_id, limit):
+    history_json = await db.get_conversation_history_json(conversation_id, limit)
+    return (b'{"type":"history","messages":' + history_json + b'}').decode()
+
+
+async def populate(db, count):
+    conversation_id = await db.create_conversation()
+    for i in range(count):
+        await db.save_message(conversation_id, ChatMessage(
+            role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+            content="Bao says hello! " * 20,
+            timestamp=datetime.now(),
+            requires_search=i % 4 == 1,
+            search_results=[{"title": "Result", "url": "https://example.com", "snippet": "Snippet text"}] if i % 4 == 1 else None
+        ))
+    return conversation_id
+
+
+def measure(loop, path, db, conversation_id, limit, runs):
+    run = lambda: loop.run_until_complete(path(db, conversation_id, limit))
+    run()  # warm up
+
+    seconds = min(timeit.repeat(run, number=runs, repeat=3)) / runs
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50, help="messages in the benchmarked history")
+    parser.add_argument("--runs", type=int, default=200, help="loads per timing repeat")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        conversation_id = loop.run_until_complete(populate(db, args.messages))
+
+        print(f"{args.messages} messages, {args.runs} loads x 3 repeats")
+        print(f"{'path':<10} {'us/message':>12} {'peak KiB':>10} {'bytes/message':>14}")
+        for name, path in (("model", model_path), ("orjson", fast_path)):
+            seconds, peak = measure(loop, path, db, conversation_id, args.messages, args.runs)
+            print(f"{name:<10} {seconds / args.messages * 1e6:>12.2f} {peak / 1024:>10.1f} {peak / args.messages:>14.0f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
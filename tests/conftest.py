@@ -0,0 +1,46 @@
+import os
+import sys
+import pytest
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Backend modules import each other as top-level modules (see backend/app.py)
+sys.path.insert(0, os.path.join(REPO_DIR, "backend"))
+
+
+@pytest.fixture(scope="session")
+def bao(tmp_path_factory):
+    """The app module, importing against a temporary database and archive"""
+    tmp = tmp_path_factory.mktemp("bao")
+    loaded_modules = set(sys.modules)
+    # The app reads its settings and frontend/ only at import, so restore them right after
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_PATH", str(tmp / "db" / "conversations.db"))
+        mp.setenv("ARCHIVE_PATH", str(tmp / "archive"))
+        mp.chdir(REPO_DIR)
+        import app
+    yield app
+
+    # Drop the app and anything it imported so later imports start clean
+    for name in set(sys.modules) - loaded_modules:
+        del sys.modules[name]
+
+
+@pytest.fixture
+def client(bao, monkeypatch):
+    """TestClient for the app with Ollama replaced by a three-word stub"""
+    from fastapi.testclient import TestClient
+
+    idle_during_generation = []
+
+    async def generate_response(prompt, context=None, stream=True):
+        idle_during_generation.append(bao.manager.is_idle())
+        if prompt == "explode":
+            raise RuntimeError("stub failure")
+        for word in ("Hello", " from", " stub"):
+            yield word
+
+    monkeypatch.setattr(bao.ollama, "generate_response", generate_response)
+    with TestClient(bao.app) as client:
+        client.idle_during_generation = idle_during_generation
+        yield client
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_chat_streams_sse_and_ends_with_response(client):
+    response = client.post("/chat", json={"message": "hi", "enable_search": False})
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = response.text.strip().split("\n\n")
+    assert events[-1].startswith("event: done\n")
+    done = json.loads(events[-1].split("data: ", 1)[1])
+    assert done["response"] == "Hello from stub"
+    assert client.get(f"/conversations/{done['conversation_id']}/messages").json()[-1]["content"] == "Hello from stub"
+
+
+def test_batch_dedupes_and_reports_failures(client):
+    response = client.post("/chat/batch", json={
+        "prompts": ["a", "explode", "b", "a"],
+        "enable_search": False
+    })
+    lines = ndjson(response)
+
+    results = {line["prompt"]: line for line in lines if line["type"] == "result"}
+    errors = [line for line in lines if line["type"] == "error"]
+    summary = lines[-1]
+
+    assert results["a"]["indexes"] == [0, 3]
+    assert results["b"]["response"] == "Hello from stub"
+    assert errors == [{"type": "error", "indexes": [1], "prompt": "explode", "detail": "stub failure"}]
+    assert summary["type"] == "summary"
+    assert summary["unique_prompts"] == 3
+    assert summary["failed_prompts"] == 1
+
+
+def test_batch_only_saves_conversations_when_persisting(client):
+    before = len(client.get("/conversations").json())
+
+    client.post("/chat/batch", json={"prompts": ["c", "d"], "enable_search": False})
+    assert len(client.get("/conversations").json()) == before
+
+    lines = ndjson(client.post("/chat/batch", json={"prompts": ["e"], "enable_search": False, "persist": True}))
+    assert lines[0]["conversation_id"]
+    assert len(client.get("/conversations").json()) == before + 1
+
+
+def test_chat_turns_keep_maintenance_from_seeing_idle(client, bao, monkeypatch):
+    monkeypatch.setattr(bao.manager, "idle_after_seconds", 0)
+
+    client.post("/chat", json={"message": "hi", "enable_search": False})
+    client.post("/chat/batch", json={"prompts": ["f"], "enable_search": False})
+    with client.websocket_connect("/ws/idle-check") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "chat", "message": "hi", "enable_search": False})
+        # The pong is only sent once the server has finished the chat turn
+        websocket.send_json({"type": "ping"})
+        while websocket.receive_json()["type"] != "pong":
+            pass
+
+        # An open socket with no turn in flight does not block maintenance
+        assert bao.manager.is_idle()
+        assert bao.manager.is_open("idle-check")
+
+    assert client.idle_during_generation == [False, False, False]
+
+
+def test_recent_chat_activity_is_not_idle(client, bao, monkeypatch):
+    monkeypatch.setattr(bao.manager, "idle_after_seconds", 3600)
+    client.post("/chat", json={"message": "hi", "enable_search": False})
+    assert not bao.manager.is_idle()
+
+    monkeypatch.setattr(bao.manager, "last_activity", bao.manager.last_activity - 3600)
+    assert bao.manager.is_idle()
+
+
+def test_app_import_leaves_environment_untouched(bao):
+    assert os.environ.get("DATABASE_PATH") != bao.db.db_path
+    assert os.environ.get("ARCHIVE_PATH") != bao.maintenance.archive_dir
+
+
+def test_websocket_history_frame_includes_saved_messages(client):
+    # send_json on pydantic datetimes used to raise TypeError here
+    done = client.post("/chat", json={"message": "hi", "enable_search": False}).text.strip().split("\n\n")[-1]
+    conversation_id = json.loads(done.split("data: ", 1)[1])["conversation_id"]
+
+    with client.websocket_connect(f"/ws/{conversation_id}") as websocket:
+        frame = websocket.receive_json()
+
+    assert frame["type"] == "history"
+    assert [(msg["role"], msg["content"]) for msg in frame["messages"]] == [
+        ("user", "hi"),
+        ("assistant", "Hello from stub"),
+    ]
+    assert frame["messages"] == client.get(f"/conversations/{conversation_id}/messages").json()
+
+
+def test_chat_reports_failures_as_sse_error_event(client):
+    response = client.post("/chat", json={"message": "explode", "enable_search": False})
+    assert response.status_code == 200
+
+    events = response.text.strip().split("\n\n")
+    assert events[-1].startswith("event: error\n")
+    error = json.loads(events[-1].split("data: ", 1)[1])
+    assert error["type"] == "error"
+    assert error["detail"] == "stub failure"
+    assert error["conversation_id"]
+
+
+def test_complete_chat_returns_done_response(client, bao):
+    response = asyncio.run(bao.complete_chat(None, "hi", enable_search=False))
+    assert response.response == "Hello from stub"
+    assert response.conversation_id is None
+
+
+def test_database_path_comes_from_environment(bao):
+    # conftest points DATABASE_PATH at a directory that did not exist yet
+    assert bao.db.db_path.endswith(os.path.join("db", "conversations.db"))
+    assert os.path.exists(bao.db.db_path)
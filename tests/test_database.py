@@ -0,0 +1,58 @@
+import asyncio
+from datetime import datetime
+import orjson
+import pytest
+from fastapi.encoders import jsonable_encoder
+from database import Database
+from models import ChatMessage, MessageRole
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / "conversations.db"))
+
+
+async def save_sample_history(db: Database) -> str:
+    conversation_id = await db.create_conversation()
+    await db.save_message(conversation_id, ChatMessage(
+        role=MessageRole.USER,
+        content="What is the weather today?",
+        timestamp=datetime.now()
+    ))
+    await db.save_message(conversation_id, ChatMessage(
+        role=MessageRole.ASSISTANT,
+        content="Sunny with a chance of bao ☀️",
+        timestamp=datetime.now(),
+        requires_search=True,
+        search_results=[{"title": "Forecast", "url": "https://example.com", "snippet": "Sunny", "source": "DuckDuckGo"}]
+    ))
+    return conversation_id
+
+
+def test_history_json_matches_model_serialization(db):
+    async def scenario():
+        conversation_id = await save_sample_history(db)
+        fast = await db.get_conversation_history_json(conversation_id)
+        models = await db.get_conversation_history(conversation_id)
+        return fast, models
+
+    fast, models = asyncio.run(scenario())
+    assert orjson.loads(fast) == jsonable_encoder([msg.dict() for msg in models])
+    assert "T" in orjson.loads(fast)[0]["timestamp"]
+
+
+def test_history_json_respects_limit_and_order(db):
+    async def scenario():
+        conversation_id = await db.create_conversation()
+        for i in range(5):
+            await db.save_message(conversation_id, ChatMessage(
+                role=MessageRole.USER, content=f"message {i}", timestamp=datetime.now()
+            ))
+        return await db.get_conversation_history_json(conversation_id, limit=3)
+
+    messages = orjson.loads(asyncio.run(scenario()))
+    assert [msg["content"] for msg in messages] == ["message 2", "message 3", "message 4"]
+
+
+def test_history_json_for_unknown_conversation_is_empty(db):
+    assert asyncio.run(db.get_conversation_history_json("missing")) == b"[]"
@@ -0,0 +1,360 @@
+import asyncio
+import os
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+from database import Database
+from maintenance_service import MaintenanceService
+from models import ChatMessage, MessageRole
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / "conversations.db"))
+
+
+async def add_conversation(db: Database, messages: int = 2, age_days: int = 0) -> str:
+    conversation_id = await db.create_conversation()
+    for i in range(messages):
+        await db.save_message(conversation_id, ChatMessage(
+            role=MessageRole.USER,
+            content=f"message {i}",
+            timestamp=datetime.now()
+        ))
+    if age_days:
+        conn = sqlite3.connect(db.db_path)
+        conn.execute(
+            "UPDATE conversations SET updated_at = ? WHERE id = ?",
+            (datetime.now() - timedelta(days=age_days), conversation_id)
+        )
+        conn.commit()
+        conn.close()
+    return conversation_id
+
+
+def add_bulky_conversations(db: Database, count: int, kilobytes: int = 64) -> list:
+    """Insert `count` conversations of about `kilobytes` each, oldest first"""
+    conn = sqlite3.connect(db.db_path)
+    ids = []
+    for i in range(count):
+        conversation_id = f"bulky-{i:03d}"
+        updated_at = datetime.now() - timedelta(hours=count - i)
+        conn.execute(
+            "INSERT INTO conversations (id, created_at, updated_at) VALUES (?, ?, ?)",
+            (conversation_id, updated_at, updated_at)
+        )
+        conn.executemany(
+            "INSERT INTO messages (conversation_id, role, content, timestamp, requires_search) VALUES (?, ?, ?, ?, ?)",
+            [(conversation_id, "user", "x" * 1024, updated_at, False) for _ in range(kilobytes)]
+        )
+        ids.append(conversation_id)
+    conn.commit()
+    conn.close()
+    return ids
+
+
+def conversation_ids(db: Database) -> set:
+    return {row["id"] for row in asyncio.run(db.get_all_conversations())}
+
+
+def test_nothing_is_archived_or_deleted_by_default(db, tmp_path):
+    async def scenario():
+        for _ in range(3):
+            await add_conversation(db, age_days=400)
+        maintenance = MaintenanceService(db, archive_dir=str(tmp_path / "archive"), vacuum_step_delay=0)
+        await maintenance.run_once()
+        return maintenance
+
+    maintenance = asyncio.run(scenario())
+    assert maintenance.archived_total == 0
+    assert maintenance.deleted_total == 0
+    assert len(asyncio.run(db.get_all_conversations())) == 3
+
+
+def test_conversations_in_use_are_not_archived_or_deleted(db, tmp_path):
+    async def scenario():
+        open_id = await add_conversation(db, age_days=60)
+        closed_id = await add_conversation(db, age_days=60)
+        maintenance = MaintenanceService(
+            db,
+            is_in_use=lambda conversation_id: conversation_id == open_id,
+            archive_dir=str(tmp_path / "archive"),
+            archive_after_days=30,
+            max_conversations=0
+        )
+        await maintenance.run_once()
+        return open_id, closed_id, maintenance
+
+    open_id, closed_id, maintenance = asyncio.run(scenario())
+    assert maintenance.get_archived_conversation_ids() == [closed_id]
+    assert [row["id"] for row in asyncio.run(db.get_all_conversations())] == [open_id]
+
+
+def test_rearchiving_merges_with_existing_archive(db, tmp_path):
+    async def scenario():
+        maintenance = MaintenanceService(db, archive_dir=str(tmp_path / "archive"))
+        conversation_id = await add_conversation(db, messages=3)
+        await maintenance.archive_conversation(conversation_id)
+
+        # A late save re-creates the row with only the new message
+        await db.save_message(conversation_id, ChatMessage(role=MessageRole.USER, content="late", timestamp=datetime.now()))
+        await maintenance.archive_conversation(conversation_id)
+
+        assert await maintenance.restore_conversation(conversation_id)
+        return conversation_id, await db.get_conversation_history(conversation_id)
+
+    conversation_id, history = asyncio.run(scenario())
+    assert [msg.content for msg in history] == ["message 0", "message 1", "message 2", "late"]
+    assert not os.path.exists(tmp_path / "archive" / f"{conversation_id}.json.gz")
+
+
+def test_messages_saved_while_archiving_are_kept(db, tmp_path):
+    maintenance = MaintenanceService(db, archive_dir=str(tmp_path / "archive"))
+    write_archive = maintenance._write_archive
+
+    def write_archive_during_save(conversation_id, data):
+        # A client saves a message between the export and the delete
+        conn = sqlite3.connect(db.db_path)
+        conn.execute(
+            "INSERT INTO messages (conversation_id, role, content, timestamp, requires_search) VALUES (?, ?, ?, ?, ?)",
+            (conversation_id, "user", "late", datetime.now(), False)
+        )
+        conn.commit()
+        conn.close()
+        write_archive(conversation_id, data)
+
+    maintenance._write_archive = write_archive_during_save
+
+    async def scenario():
+        conversation_id = await add_conversation(db, messages=2)
+        assert await maintenance.archive_conversation(conversation_id)
+        remaining = await db.get_conversation_history(conversation_id)
+
+        # The next archive run picks up the late message and merges it
+        maintenance._write_archive = write_archive
+        assert await maintenance.archive_conversation(conversation_id)
+        assert await maintenance.restore_conversation(conversation_id)
+        return remaining, await db.get_conversation_history(conversation_id)
+
+    remaining, restored = asyncio.run(scenario())
+    assert [msg.content for msg in remaining] == ["late"]
+    assert [msg.content for msg in restored] == ["message 0", "message 1", "late"]
+
+
+def test_new_database_uses_incremental_vacuum(db):
+    assert asyncio.run(db.has_incremental_vacuum())
+
+
+def test_existing_database_is_converted_by_maintenance(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE conversations (id TEXT PRIMARY KEY, created_at TIMESTAMP, updated_at TIMESTAMP)")
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    assert not asyncio.run(db.has_incremental_vacuum())
+
+    maintenance = MaintenanceService(db, archive_dir=str(tmp_path / "archive"))
+    asyncio.run(maintenance.run_once())
+    assert asyncio.run(db.has_incremental_vacuum())
+    assert asyncio.run(maintenance.get_status())["incremental_vacuum"]
+
+
+def test_failed_conversion_does_not_stop_maintenance(tmp_path, capsys):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE conversations (id TEXT PRIMARY KEY, created_at TIMESTAMP, updated_at TIMESTAMP)")
+    conn.commit()
+    conn.close()
+    db = Database(path)
+
+    maintenance = MaintenanceService(db, archive_dir=str(tmp_path / "archive"))
+
+    # Another connection holding a write lock makes VACUUM fail
+    locker = sqlite3.connect(path)
+    locker.execute("BEGIN IMMEDIATE")
+    try:
+        asyncio.run(maintenance.enable_incremental_vacuum())
+    finally:
+        locker.rollback()
+        locker.close()
+
+    assert "Could not enable incremental vacuum" in capsys.readouterr().out
+    assert not maintenance.incremental_vacuum_enabled
+
+    # Retried on a later run once the database is free
+    asyncio.run(maintenance.run_once())
+    assert maintenance.incremental_vacuum_enabled
+
+
+def test_archives_expire_by_conversation_age_not_archive_time(db, tmp_path):
+    async def scenario():
+        maintenance = MaintenanceService(db, archive_dir=str(tmp_path / "archive"), archive_after_days=30)
+        expired_id = await add_conversation(db, age_days=100)
+        kept_id = await add_conversation(db, age_days=40)
+        await maintenance.run_once()
+        assert sorted(maintenance.get_archived_conversation_ids()) == sorted([expired_id, kept_id])
+
+        # Both archive files are brand new, but one conversation is past retention
+        maintenance.retention_days = 90
+        await maintenance.apply_retention()
+        return expired_id, kept_id, maintenance.get_archived_conversation_ids()
+
+    expired_id, kept_id, archived = asyncio.run(scenario())
+    assert archived == [kept_id]
+
+
+def test_incremental_vacuum_releases_free_pages(db):
+    ids = add_bulky_conversations(db, 10)
+
+    async def scenario():
+        for conversation_id in ids:
+            await db.delete_conversation(conversation_id)
+        before = await db.get_storage_stats()
+        remaining = await db.incremental_vacuum(100)
+        after = await db.get_storage_stats()
+        return before, remaining, after
+
+    before, remaining, after = asyncio.run(scenario())
+    assert before["freelist_count"] > 100
+    assert remaining == after["freelist_count"] == before["freelist_count"] - 100
+    assert after["file_size"] == before["file_size"] - 100 * before["page_size"]
+
+
+def test_vacuum_stops_when_system_becomes_busy(db, tmp_path):
+    ids = add_bulky_conversations(db, 10)
+    idle_checks = []
+
+    def is_idle():
+        # Idle for the first two vacuum steps, then a chat starts
+        idle_checks.append(True)
+        return len(idle_checks) <= 2
+
+    maintenance = MaintenanceService(
+        db, is_idle=is_idle, archive_dir=str(tmp_path / "archive"),
+        vacuum_step_pages=8, vacuum_step_delay=0
+    )
+
+    async def scenario():
+        for conversation_id in ids:
+            await db.delete_conversation(conversation_id)
+        before = (await db.get_storage_stats())["freelist_count"]
+        await maintenance.vacuum_while_idle()
+        return before, (await db.get_storage_stats())["freelist_count"]
+
+    before, after = asyncio.run(scenario())
+    assert after == before - 16
+    assert maintenance.last_vacuum is not None
+
+
+def test_vacuum_runs_to_completion_when_idle(db, tmp_path):
+    ids = add_bulky_conversations(db, 5)
+    maintenance = MaintenanceService(db, archive_dir=str(tmp_path / "archive"), vacuum_step_delay=0)
+
+    async def scenario():
+        for conversation_id in ids:
+            await db.delete_conversation(conversation_id)
+        await maintenance.run_once()
+        return await maintenance.get_status()
+
+    status = asyncio.run(scenario())
+    assert status["database"]["freelist_count"] == 0
+    assert status["database"]["fragmentation"] == 0.0
+
+
+def test_analyze_runs_when_due_and_idle(db, tmp_path):
+    add_bulky_conversations(db, 2, kilobytes=1)
+    idle = [False]
+    maintenance = MaintenanceService(
+        db, is_idle=lambda: idle[0], archive_dir=str(tmp_path / "archive"), analyze_interval_hours=24
+    )
+    analyze = db.analyze
+    calls = []
+
+    async def counting_analyze():
+        calls.append(datetime.now())
+        await analyze()
+
+    db.analyze = counting_analyze
+
+    asyncio.run(maintenance.run_once())
+    assert calls == []  # busy
+
+    idle[0] = True
+    asyncio.run(maintenance.run_once())
+    assert len(calls) == 1
+    conn = sqlite3.connect(db.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+    conn.close()
+
+    asyncio.run(maintenance.run_once())
+    assert len(calls) == 1  # not due yet
+
+    maintenance.last_analyze -= timedelta(hours=25)
+    asyncio.run(maintenance.run_once())
+    assert len(calls) == 2
+
+
+def test_age_retention_deletes_old_conversations(db, tmp_path):
+    async def scenario():
+        old_id = await add_conversation(db, age_days=100)
+        recent_id = await add_conversation(db, age_days=10)
+        maintenance = MaintenanceService(db, archive_dir=str(tmp_path / "archive"), retention_days=30)
+        await maintenance.apply_retention()
+        return old_id, recent_id, maintenance
+
+    old_id, recent_id, maintenance = asyncio.run(scenario())
+    assert conversation_ids(db) == {recent_id}
+    assert maintenance.deleted_total == 1
+    assert asyncio.run(db.get_conversation_history(old_id)) == []
+
+
+def test_count_retention_keeps_newest_conversations(db, tmp_path):
+    ids = add_bulky_conversations(db, 5, kilobytes=1)
+    maintenance = MaintenanceService(db, archive_dir=str(tmp_path / "archive"), max_conversations=2)
+    asyncio.run(maintenance.apply_retention())
+    assert conversation_ids(db) == set(ids[-2:])
+
+
+def test_size_retention_deletes_oldest_until_under_limit(db, tmp_path):
+    ids = add_bulky_conversations(db, 40, kilobytes=64)  # about 2.5 MB
+    maintenance = MaintenanceService(db, archive_dir=str(tmp_path / "archive"), max_db_size_mb=1)
+    asyncio.run(maintenance.apply_retention())
+
+    kept = conversation_ids(db)
+    stats = asyncio.run(db.get_storage_stats())
+    assert stats["used_size"] <= 1024 * 1024
+    assert kept and kept == set(ids[-len(kept):])
+
+
+def test_status_reports_fragmentation(db, tmp_path):
+    ids = add_bulky_conversations(db, 10)
+
+    async def scenario():
+        for conversation_id in ids[:5]:
+            await db.delete_conversation(conversation_id)
+        maintenance = MaintenanceService(db, archive_dir=str(tmp_path / "archive"))
+        return await maintenance.get_status()
+
+    status = asyncio.run(scenario())
+    stats = status["database"]
+    assert stats["conversation_count"] == 5
+    assert stats["file_size"] == stats["page_count"] * stats["page_size"]
+    assert stats["free_size"] == stats["freelist_count"] * stats["page_size"]
+    assert stats["used_size"] + stats["free_size"] == stats["file_size"]
+    assert stats["fragmentation"] == pytest.approx(stats["freelist_count"] / stats["page_count"])
+    assert 0.3 < stats["fragmentation"] < 0.7
+
+
+def test_status_endpoint(client, bao):
+    status = client.get("/maintenance/status").json()
+    stats = status["database"]
+    assert stats["fragmentation"] == pytest.approx(stats["freelist_count"] / stats["page_count"])
+    assert status["config"] == {
+        "archive_after_days": None,
+        "retention_days": None,
+        "max_conversations": None,
+        "max_db_size_mb": None,
+    }
+    assert status["archive"] == {"conversation_count": 0, "size": 0}
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import re
+import pytest
+from fastapi.testclient import TestClient
+import static_service
+from static_service import StaticAssets, MAX_MEMORY_ASSET_SIZE
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend")
+
+
+@pytest.fixture
+def make_client(bao, monkeypatch):
+    """TestClient for the app's own routes, serving the given frontend directory"""
+    def make(directory: str) -> TestClient:
+        monkeypatch.setattr(bao, "static_assets", StaticAssets(directory))
+        return TestClient(bao.app)
+    return make
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client(FRONTEND_DIR)
+
+
+def hashed_url(client: TestClient, name: str) -> str:
+    html = client.get("/", headers={"Accept-Encoding": "identity"}).text
+    return re.search(rf'/static/{name}\.[0-9a-f]{{12}}\.\w+', html).group(0)
+
+
+def test_gzip_variant_is_smaller_than_identity(client):
+    for path in ("/", "/static/app.js", "/static/style.css"):
+        identity = client.get(path, headers={"Accept-Encoding": "identity"})
+        gzipped = client.get(path, headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in identity.headers
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert gzipped.content == identity.content
+        # Content-Length is the size on the wire, before the client decodes it
+        assert int(gzipped.headers["content-length"]) < int(identity.headers["content-length"]) / 2
+
+
+@pytest.mark.skipif(static_service.brotli is None, reason="Brotli not installed")
+def test_brotli_variant_is_preferred_and_smallest(client):
+    identity = client.get("/static/app.js", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+    compressed = client.get("/static/app.js", headers={"Accept-Encoding": "gzip, br"})
+
+    assert compressed.headers["content-encoding"] == "br"
+    assert int(compressed.headers["content-length"]) < int(gzipped.headers["content-length"])
+    assert int(compressed.headers["content-length"]) < int(identity.headers["content-length"])
+
+
+def test_if_none_match_returns_304(client):
+    first = client.get("/", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["etag"]
+
+    second = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+
+def test_etag_differs_per_encoding(client):
+    identity = client.get("/", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert identity.headers["etag"] != gzipped.headers["etag"]
+
+    stale = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["etag"]})
+    assert stale.status_code == 200
+
+
+def test_hashed_urls_are_immutable(client):
+    url = hashed_url(client, "app")
+    response = client.get(url)
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+
+    plain = client.get("/static/app.js")
+    assert "immutable" not in plain.headers["cache-control"]
+    assert plain.content == response.content
+
+
+def test_index_references_are_rewritten(client):
+    html = client.get("/").text
+    assert '"/static/app.js"' not in html
+    assert client.get(hashed_url(client, "style")).status_code == 200
+
+
+def test_unknown_paths_return_404(client):
+    assert client.get("/static/missing.js").status_code == 404
+    assert client.get("/static/app.000000000000.js").status_code == 404
+
+
+def test_head_requests_are_supported(client):
+    assert client.head("/").status_code == 200
+    assert client.head("/static/app.js").status_code == 200
+
+
+def test_large_rewritten_asset_matches_its_hash(make_client, tmp_path):
+    (tmp_path / "icon.svg").write_text("<svg></svg>")
+    padding = "/* " + "x" * MAX_MEMORY_ASSET_SIZE + " */\n"
+    (tmp_path / "big.js").write_text(padding + 'const icon = "/static/icon.svg";\n')
+    (tmp_path / "index.html").write_text('<script src="/static/big.js"></script>')
+
+    client = make_client(str(tmp_path))
+    url = hashed_url(client, "big")
+    body = client.get(url).content
+
+    assert b'"/static/icon.svg"' not in body
+    assert hashlib.sha256(body).hexdigest()[:12] in url
+
+
+def test_index_missing_returns_404(make_client, tmp_path):
+    assert make_client(str(tmp_path)).get("/").status_code == 404